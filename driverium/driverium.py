@@ -1,12 +1,74 @@
-from sys import platform
-from zipfile import ZipFile
+from sys import platform, stderr
+from threading import Thread
+from zipfile import ZipFile, ZipInfo, BadZipFile, ZIP_STORED, ZIP_DEFLATED
 import os
 import io
+import shutil
+import uuid
 import json
+import time
+import struct
+import zlib
 
 import chrome_version
 import requests
-from tqdm import tqdm
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+VERSIONS_URL = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
+VERSIONS_CACHE_TTL = 24 * 60 * 60
+DRIVERS_STORAGE_URL = "https://storage.googleapis.com/chrome-for-testing-public/"
+DOWNLOAD_CHUNK_SIZE = 128 * 1024
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 0.2
+PREWARM_TIMEOUT = 3
+
+# End of central directory record (22 bytes) plus the largest possible archive comment.
+ZIP_TAIL_SIZE = 22 + 65535
+LOCAL_HEADER_STRUCT = "<4s2B4HL2L2H"
+LOCAL_HEADER_SIZE = struct.calcsize(LOCAL_HEADER_STRUCT)
+
+_PLATF = "".join(x for x in platform if x.isalpha()) + "64"
+
+class _Progress:
+    """
+    A minimal download progress printer that writes to stderr at most once per PROGRESS_INTERVAL seconds.
+    Args:
+        total (int): The expected number of bytes, 0 if unknown.
+        disable (bool, optional): Flag indicating whether to suppress the output. Defaults to False.
+    """
+    
+    def __init__(self, total:int, disable:bool = False):
+        self.total = total
+        self.disable = disable
+        self.done = 0
+        self.next_report = time.monotonic()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.disable:
+            self.report()
+            stderr.write("\n")
+    
+    def update(self, size:int) -> None:
+        self.done += size
+        if not self.disable and time.monotonic() >= self.next_report:
+            self.report()
+            self.next_report = time.monotonic() + PROGRESS_INTERVAL
+    
+    def report(self) -> None:
+        if self.total:
+            stderr.write(f"\rdriver download: {self.done / self.total:.1%} of {self.total / 2 ** 20:.1f} MiB")
+        else:
+            stderr.write(f"\rdriver download: {self.done / 2 ** 20:.1f} MiB")
+        stderr.flush()
 
 class Driverium:
     """
@@ -20,14 +82,21 @@ class Driverium:
             Retrieves the URL of the ChromeDriver based on the specified Chrome version.
         download_driver(url: str) -> str:
             Downloads the ChromeDriver from the specified URL and returns the path to the downloaded driver.
+        range_extract(url: str) -> str:
+            Extracts only the ChromeDriver from the zip archive at the specified URL using HTTP range requests.
         get_driver() -> str:
             Retrieves the path to the ChromeDriver. If the driver is not found, it will download it first.
         quiet_download(url: str) -> io.BytesIO:
             Downloads the file from the specified URL without displaying progress.
         progress_download(url: str) -> io.BytesIO:
-            Downloads the file from the specified URL and displays progress using a progress bar.
+            Downloads the file from the specified URL and displays the download progress.
+        close() -> None:
+            Closes the underlying HTTP session. Also called when Driverium is used as a context manager.
     """
     
+    _versions_index = None
+    _resolved_cache = {}
+    
     def __init__(self, browser_version:str = None, download_path:str = None, logging:bool = False):
         
         if browser_version is None:
@@ -39,9 +108,30 @@ class Driverium:
             self.download_path = os.getcwd()
         else:
             self.download_path = download_path
+        
+        self._versions_cache_path = os.path.join(self.download_path, ".driverium_versions.json")
+        self._versions_etag_path = os.path.join(self.download_path, ".driverium_versions.etag")
             
-        self.platf = "".join([x for x in platform if x.isalpha()]) + "64"
+        self.platf = _PLATF
         self.logging = logging
+        
+        self._session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retries))
+        self._head_responses = {}
+        self._versions_revalidated = False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self) -> None:
+        """
+        Closes the underlying HTTP session and its pooled connections.
+        """
+        self._session.close()
     
     def get_new_driver(self) -> str:
         """
@@ -51,26 +141,15 @@ class Driverium:
         Raises:
             Exception: If no driver is found for the specified Chrome version.
         """
-        r = requests.get("https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json")
-        drivers_data = r.json()["versions"][::-1]
-
-        driver_versions = []
-        
-        for num, version in enumerate(self.chrome_version):
-            temp_list = []
-            for element in drivers_data:
-                el_version = element["version"].split(".")
-                if el_version[num] == version:
-                    if num == 0:
-                        if "chromedriver" in element["downloads"].keys():
-                            temp_list.append(element)
-                    else:
-                        temp_list.append(element)
-            if len(temp_list) > 0:
-                driver_versions = temp_list
-            else:
-                break
-            drivers_data = temp_list
+        if Driverium._versions_index is None:
+            Driverium._versions_index = self._build_versions_index(self._get_versions_data()["versions"])
+        
+        exact, driver_versions = self._match_versions()
+        
+        if not exact and not self._versions_revalidated:
+            # The cached data may predate the installed Chrome, so check for newer data once.
+            Driverium._versions_index = self._build_versions_index(self._get_versions_data(revalidate=True)["versions"])
+            exact, driver_versions = self._match_versions()
             
         if len(driver_versions) == 0:
             raise Exception(f"No driver found for version {'.'.join(self.chrome_version)}")
@@ -82,6 +161,105 @@ class Driverium:
                         print(f"Driver version: {driver['version']}")
                     return dow["url"]
     
+    def _match_versions(self) -> tuple:
+        """
+        Looks up the versions sharing the longest version prefix with the Chrome version in the versions index.
+        Returns:
+            tuple: Whether the whole Chrome version matched, and the matching versions, newest first.
+        """
+        target = tuple(self.chrome_version)
+        for k in range(len(target), 0, -1):
+            driver_versions = Driverium._versions_index.get(target[:k], [])
+            if driver_versions:
+                return k == len(target), driver_versions
+        return False, []
+    
+    @staticmethod
+    def _build_versions_index(versions:list) -> dict:
+        """
+        Indexes the versions that provide a ChromeDriver by every prefix of their version number.
+        Args:
+            versions (list): The versions from the known good versions data, oldest first.
+        Returns:
+            dict: Version prefix tuples mapped to the matching versions, newest first.
+        """
+        index = {}
+        for element in reversed(versions):
+            if "chromedriver" not in element["downloads"]:
+                continue
+            version = tuple(element["version"].split("."))
+            for k in range(1, len(version) + 1):
+                index.setdefault(version[:k], []).append(element)
+        return index
+    
+    def _get_versions_data(self, revalidate:bool = False) -> dict:
+        """
+        Retrieves the known good versions data, using the on-disk cache in the download path when possible.
+        A cache younger than VERSIONS_CACHE_TTL is used without any request, an older one is revalidated
+        with a conditional request.
+        Args:
+            revalidate (bool, optional): Flag indicating whether to revalidate the cache regardless of its age. Defaults to False.
+        Returns:
+            dict: The parsed known good versions data.
+        """
+        headers = {}
+        if os.path.exists(self._versions_cache_path):
+            if not revalidate and time.time() - os.path.getmtime(self._versions_cache_path) < VERSIONS_CACHE_TTL:
+                with open(self._versions_cache_path, "rb") as f:
+                    return _loads(f.read())
+            
+            if os.path.exists(self._versions_etag_path):
+                with open(self._versions_etag_path, "r") as f:
+                    validators = json.load(f)
+                if validators.get("etag"):
+                    headers["If-None-Match"] = validators["etag"]
+                if validators.get("last_modified"):
+                    headers["If-Modified-Since"] = validators["last_modified"]
+        
+        self._versions_revalidated = True
+        try:
+            r = self._session.get(VERSIONS_URL, headers=headers)
+        except requests.RequestException:
+            if not os.path.exists(self._versions_cache_path):
+                raise
+            r = None
+        
+        if (r is None or r.status_code != 200) and os.path.exists(self._versions_cache_path):
+            # On 304 the cache is still valid, on an error it is better than nothing.
+            if r is not None and r.status_code == 304:
+                os.utime(self._versions_cache_path)
+            with open(self._versions_cache_path, "rb") as f:
+                return _loads(f.read())
+        
+        r.raise_for_status()
+        
+        os.makedirs(self.download_path, exist_ok=True)
+        self._atomic_write(self._versions_cache_path, r.content)
+        validators = {"etag": r.headers.get("ETag"),
+                      "last_modified": r.headers.get("Last-Modified")}
+        self._atomic_write(self._versions_etag_path, json.dumps(validators).encode())
+        
+        return _loads(r.content)
+    
+    @staticmethod
+    def _atomic_write(path:str, content:bytes) -> None:
+        """
+        Writes the content to a temporary file and moves it over the given path.
+        Args:
+            path (str): The path of the file to write.
+            content (bytes): The content to write.
+        """
+        # A unique name keeps concurrent writers apart, "x" mode keeps the umask permissions of open().
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "xb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
     def get_old_driver(self) -> str:
         """
         Fetches the download URL for the old version of the ChromeDriver based on the current Chrome version.
@@ -92,15 +270,18 @@ class Driverium:
         """
         
         formatted_version = ".".join(self.chrome_version[:-1])
-        r = requests.get(f"https://chromedriver.storage.googleapis.com/LATEST_RELEASE_{formatted_version}")
+        r = self._session.get(f"https://chromedriver.storage.googleapis.com/LATEST_RELEASE_{formatted_version}")
         driver_version = r.text.strip()
 
-        r = requests.get(f"https://chromedriver.storage.googleapis.com/{driver_version}/chromedriver_{self.platf}.zip")
+        url = f"https://chromedriver.storage.googleapis.com/{driver_version}/chromedriver_{self.platf}.zip"
+        r = self._session.head(url, allow_redirects=True)
         
         if r.status_code == 404:
             return f"https://chromedriver.storage.googleapis.com/{driver_version}/chromedriver_{platform}.zip"
         else:
-            return f"https://chromedriver.storage.googleapis.com/{driver_version}/chromedriver_{self.platf}.zip"
+            # Reused by range_extract instead of sending the same HEAD request again.
+            self._head_responses[url] = r
+            return url
     
     def get_driver_url(self) -> str:
         """
@@ -112,10 +293,25 @@ class Driverium:
         """
         
         if int(self.chrome_version[0]) >= 113:
+            # Open the connection to the drivers storage while the versions data is fetched,
+            # the session keeps it in its pool for the driver download. The thread is a daemon
+            # so a stalled request never delays close() or interpreter exit.
+            if Driverium._versions_index is None:
+                Thread(target=self._prewarm, daemon=True).start()
             return self.get_new_driver()
         
         return self.get_old_driver()
                 
+    def _prewarm(self) -> None:
+        """
+        Sends a HEAD request to the drivers storage to open a connection for the driver download.
+        Failures, including the session being closed meanwhile, are ignored. The download will simply open its own connection.
+        """
+        try:
+            self._session.head(DRIVERS_STORAGE_URL, allow_redirects=False, timeout=PREWARM_TIMEOUT)
+        except Exception:
+            pass
+    
     def download_driver(self, url:str) -> str:
         """
         Downloads the driver from the given URL and returns the path to the downloaded driver.
@@ -124,38 +320,168 @@ class Driverium:
         Returns:
             str: The path to the downloaded driver.
         """
-        if self.logging:
-            zip_bytes = self.progress_download(url)
-        else:
-            zip_bytes = self.quiet_download(url)
+        file = self.range_extract(url)
+        
+        if file is None:
+            if self.logging:
+                zip_bytes = self.progress_download(url)
+            else:
+                zip_bytes = self.quiet_download(url)
 
-        with ZipFile(zip_bytes) as zip_ref:
-            for file in zip_ref.namelist():
-                if "/" in file:
-                    file_condition = file.split("/")[-1]
-                else:
-                    file_condition = file
-                if file_condition.startswith("chromedriver"):
-                    if "/" not in file:
-                        self.download_path = os.path.join(self.download_path, f"chromedriver-{self.platf}")
-                    zip_ref.extract(file, self.download_path)
-                    break
-        
-        driver_path = os.path.join(self.download_path, file)
-        if "win" in self.platf:
-            driver_path = driver_path.replace("/", "\\")
+            with ZipFile(zip_bytes) as zip_ref:
+                for file in zip_ref.namelist():
+                    if "/" in file:
+                        file_condition = file.split("/")[-1]
+                    else:
+                        file_condition = file
+                    if file_condition.startswith("chromedriver"):
+                        info = zip_ref.getinfo(file)
+                        file = self._clean_name(file)
+                        if "/" not in file:
+                            self.download_path = os.path.join(self.download_path, f"chromedriver-{self.platf}")
+                        extract_path = os.path.join(self.download_path, file)
+                        os.makedirs(os.path.dirname(extract_path), exist_ok=True)
+                        with zip_ref.open(info) as src, open(extract_path, "wb") as dst:
+                            shutil.copyfileobj(src, dst, EXTRACT_CHUNK_SIZE)
+                        self._apply_mode(extract_path, info)
+                        break
+        
+        driver_path = os.path.normpath(os.path.join(self.download_path, file))
         
         data = {"version": ".".join(self.chrome_version),
                 "path": driver_path}
         
-        with open(os.path.join("\\".join(driver_path.split("\\")[:-1]), "data.json"), "w") as f:
-            json.dump(data, f)
-        
-        if "linux" in self.platf:
-            os.chmod(driver_path, 0o755)
+        self._atomic_write(os.path.join(os.path.dirname(driver_path), "data.json"), json.dumps(data).encode())
     
         return driver_path
     
+    @staticmethod
+    def _clean_name(name:str) -> str:
+        """
+        Removes the drive, the leading slashes and the "." and ".." components from a zip entry name,
+        like ZipFile.extract does, so the entry can't be written outside the download path.
+        Args:
+            name (str): The name of the zip entry.
+        Returns:
+            str: The cleaned name, with "/" separators.
+        """
+        name = os.path.splitdrive(name.replace("\\", "/"))[1]
+        return "/".join(part for part in name.split("/") if part not in ("", ".", ".."))
+    
+    def _apply_mode(self, path:str, info:ZipInfo) -> None:
+        """
+        Makes the extracted file executable if its zip entry is marked as executable.
+        Entries without Unix mode bits are always made executable outside of Windows.
+        Args:
+            path (str): The path of the extracted file.
+            info (ZipInfo): The zip entry of the file.
+        """
+        mode = info.external_attr >> 16
+        if mode & 0o111 or (mode == 0 and not self.platf.startswith("win")):
+            os.chmod(path, 0o755)
+    
+    def range_extract(self, url:str) -> str:
+        """
+        Extracts only the ChromeDriver from the zip archive at the given URL using HTTP range requests.
+        The central directory is fetched from the tail of the archive, then only the bytes of the driver entry
+        are downloaded and decompressed straight to disk.
+        Args:
+            url (str): The URL of the zip archive.
+        Returns:
+            str: The cleaned name of the extracted file inside the archive, or None if the archive can't be read by ranges.
+        """
+        r = self._head_responses.pop(url, None)
+        if r is None:
+            r = self._session.head(url, allow_redirects=True)
+        size = int(r.headers.get("content-length", 0))
+        if r.status_code != 200 or r.headers.get("accept-ranges") != "bytes" or size == 0:
+            return None
+        
+        tail_start = max(size - ZIP_TAIL_SIZE, 0)
+        # Streamed so a server ignoring the range doesn't send the whole archive before being rejected.
+        with self._session.get(url, headers={"Range": f"bytes={tail_start}-"}, stream=True) as r:
+            if r.status_code != 206:
+                return None
+            tail = r.content
+        
+        # ZipFile treats the missing head of the archive like prepended data,
+        # so the offsets it reports are relative to tail_start.
+        try:
+            with ZipFile(io.BytesIO(tail)) as zip_ref:
+                infos = zip_ref.infolist()
+                dir_offset = zip_ref.start_dir + tail_start
+        except BadZipFile:
+            return None
+        
+        for info in infos:
+            file_condition = info.filename.split("/")[-1]
+            if file_condition.startswith("chromedriver"):
+                break
+        else:
+            return None
+        
+        if info.compress_type not in (ZIP_STORED, ZIP_DEFLATED):
+            return None
+        
+        start = info.header_offset + tail_start
+        end = min([i.header_offset + tail_start for i in infos if i.header_offset + tail_start > start] + [dir_offset])
+        
+        with self._session.get(url, headers={"Range": f"bytes={start}-{end - 1}"}, stream=True) as r:
+            if r.status_code != 206:
+                return None
+            
+            file = self._clean_name(info.filename)
+            if "/" not in file:
+                self.download_path = os.path.join(self.download_path, f"chromedriver-{self.platf}")
+            driver_path = os.path.join(self.download_path, file)
+            os.makedirs(os.path.dirname(driver_path), exist_ok=True)
+            
+            if info.compress_type == ZIP_DEFLATED:
+                decompressor = zlib.decompressobj(-15)
+            else:
+                decompressor = None
+            
+            header = b""
+            remaining = info.compress_size
+            crc = 0
+            
+            with open(driver_path, "wb") as f, _Progress(info.compress_size, disable=not self.logging) as pbar:
+                for data in r.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    if header is not None:
+                        header += data
+                        if len(header) < LOCAL_HEADER_SIZE:
+                            continue
+                        fields = struct.unpack(LOCAL_HEADER_STRUCT, header[:LOCAL_HEADER_SIZE])
+                        data_start = LOCAL_HEADER_SIZE + fields[10] + fields[11]
+                        if len(header) < data_start:
+                            continue
+                        data = header[data_start:]
+                        header = None
+                    
+                    data = data[:remaining]
+                    remaining -= len(data)
+                    pbar.update(len(data))
+                    
+                    if decompressor is not None:
+                        data = decompressor.decompress(data)
+                    crc = zlib.crc32(data, crc)
+                    f.write(data)
+                    
+                    if remaining == 0:
+                        break
+                
+                if decompressor is not None:
+                    data = decompressor.flush()
+                    crc = zlib.crc32(data, crc)
+                    f.write(data)
+        
+        if remaining != 0 or crc != info.CRC:
+            os.remove(driver_path)
+            raise BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+        
+        self._apply_mode(driver_path, info)
+        return file
+    
     def get_driver(self) -> str:
         """
         Retrieves the path to the ChromeDriver. If the driver is not found, it will download it first.
@@ -166,18 +492,29 @@ class Driverium:
             print("Detected Chrome version:", ".".join(self.chrome_version))
         path_to_driver = os.path.join(self.download_path, f"chromedriver-{self.platf}")
         path_to_data = os.path.join(path_to_driver, "data.json")
-        if os.path.exists(path_to_data):
-            with open(os.path.join(path_to_driver, "data.json"), "r") as f:
-                data = json.load(f)
-                
-            if data["version"] == ".".join(self.chrome_version):
-                path_to_driver = data["path"]
-            
+        cache_key = (".".join(self.chrome_version), self.download_path)
+        cached = Driverium._resolved_cache.get(cache_key)
+        try:
+            if cached is not None and cached[0] == os.path.getmtime(path_to_data):
+                data_mtime = cached[0]
+                data = {"version": cache_key[0], "path": cached[1]}
             else:
-                os.remove(os.path.join(path_to_driver, "data.json"))
-                os.remove(data["path"])
-                path_to_driver = self.download_driver(self.get_driver_url())
+                with open(path_to_data, "r") as f:
+                    data_mtime = os.fstat(f.fileno()).st_mtime
+                    data = json.load(f)
+        except FileNotFoundError:
+            data = None
+        
+        if data is None:
+            path_to_driver = self.download_driver(self.get_driver_url())
+        
+        elif data["version"] == ".".join(self.chrome_version):
+            path_to_driver = data["path"]
+            Driverium._resolved_cache[cache_key] = (data_mtime, path_to_driver)
+        
         else:
+            os.remove(path_to_data)
+            os.remove(data["path"])
             path_to_driver = self.download_driver(self.get_driver_url())
             
         if self.logging:
@@ -192,24 +529,24 @@ class Driverium:
         Returns:
             io.BytesIO: The content of the URL as a BytesIO object.
         """
-        r = requests.get(url)
+        r = self._session.get(url)
         return io.BytesIO(r.content)
     
     def progress_download(self, url:str) -> io.BytesIO:
         """
-        Downloads a file from the given URL and tracks the progress using a progress bar.
+        Downloads a file from the given URL and reports the download progress.
         Args:
             url (str): The URL of the file to download.
         Returns:
             io.BytesIO: The downloaded file as a BytesIO object.
         """
-        response = requests.get(url, stream=True)
+        response = self._session.get(url, stream=True)
         total_size = int(response.headers.get('content-length', 0))
 
         zip_bytes = io.BytesIO()
         
-        with tqdm(total=total_size, unit='B', unit_scale=True, desc='driver download', initial=0, ascii=True) as pbar:
-            for data in response.iter_content(1024):
+        with _Progress(total_size) as pbar:
+            for data in response.iter_content(DOWNLOAD_CHUNK_SIZE):
                 zip_bytes.write(data)
                 pbar.update(len(data))
 
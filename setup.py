@@ -24,5 +24,6 @@ setup(
   classifiers=classifiers,
   keywords='python, selenium, webdriver, chromedriver',
   packages=find_packages(),
-  install_requires=['requests', 'chrome-version', 'tqdm'] 
+  install_requires=['requests', 'chrome-version'],
+  extras_require={'fast': ['orjson']} 
 )
\ No newline at end of file